@@ -1,11 +1,20 @@
 from os.path import join
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
 
-from formatConverters import FileExtension, MarkdownToHtml, MARKDOWN, HTML
+from .formatConverters import (
+    FileExtension, MARKDOWN, HTML, HTML_PROLOGUE, HTML_EPILOGUE)
 
 
 # String to tag things as needing work
 TODO_DESC = "TODO: description"
 
+# Size (in bytes) of the buffer used when writing documentation files
+WRITE_BUFFER_SIZE = 65536
+
+# Maximum number of threads used to write node documentation files
+MAX_DOC_THREADS = 32
+
 
 class NodeInfo:
     """The NodeInfo class contains all the information pertaining to
@@ -22,24 +31,32 @@ class NodeInfo:
 
         """
         self.__nodeName = nodeName
+        self.__cleanName = None  # Computed on first use
 
         # Info about a node
-        self.__params = []
+        self.__params = set()
         self.__pubs = {}
         self.__subs = {}
         self.__services = {}
 
+    def getName(self):
+        """Get the name of this node."""
+        return self.__nodeName
+
     def getCleanName(self):
         """Get a clean name for this node so that it can be used
         as a filename.
 
         """
-        # Create a node name that can be used as a filename
-        cleanNodeName = self.__nodeName.replace("/", "_")
-        if cleanNodeName.startswith("_"):
-            cleanNodeName = cleanNodeName[1:]
+        if self.__cleanName is None:
+            # Create a node name that can be used as a filename
+            cleanNodeName = self.__nodeName.replace("/", "_")
+            if cleanNodeName.startswith("_"):
+                cleanNodeName = cleanNodeName[1:]
+
+            self.__cleanName = cleanNodeName
 
-        return cleanNodeName
+        return self.__cleanName
 
     def addParam(self, param):
         """Add a parameter to this node.
@@ -47,8 +64,7 @@ class NodeInfo:
         * param -- the parameter
 
         """
-        if param not in self.__params:
-            self.__params.append(param)
+        self.__params.add(param)
 
     def addPub(self, topic, pubType):
         """Add a published topic to this node.
@@ -57,7 +73,9 @@ class NodeInfo:
         * pubType -- the type of data
 
         """
-        self.__pubs[topic] = pubType
+        # Nodes re-register the same topic (e.g., on reconnect)
+        if self.__pubs.get(topic) != pubType:
+            self.__pubs[topic] = pubType
 
     def addSub(self, topic, subType):
         """Add a subscribed topic to this node.
@@ -66,7 +84,9 @@ class NodeInfo:
         * pubType -- the type of data
 
         """
-        self.__subs[topic] = subType
+        # Nodes re-register the same topic (e.g., on reconnect)
+        if self.__subs.get(topic) != subType:
+            self.__subs[topic] = subType
 
     def addService(self, service, serviceType):
         """Add a service to this node.
@@ -75,7 +95,9 @@ class NodeInfo:
         * serviceType -- the type of service
 
         """
-        self.__services[service] = serviceType
+        # Nodes re-register the same service (e.g., on reconnect)
+        if self.__services.get(service) != serviceType:
+            self.__services[service] = serviceType
 
     def document(self, outputDir, docFormat=MARKDOWN):
         """Document the information pertaining to the nodes.
@@ -84,75 +106,86 @@ class NodeInfo:
         * docFormat -- the desired format of the documentation
 
         """
-        lines = [
-            "# The %s node" % self.__nodeName,
-            "",
-        ]
-
-        # Document parameters
-        lines.extend([
-            "## Parameters:",
-            ])
-        for name in sorted(self.__params):
-            name = self.__removeNamespace(name)
-            lines.append("- %s [TODO: type] -- %s" % (name, TODO_DESC))
-
-        # Document services
-        lines.extend([
-            "",
-            "## Services:",
-        ])
-        sortedServices = sorted(self.__services.keys())
-        for name in sortedServices:
-            serviceType = self.__services[name]
-            name = self.__removeNamespace(name)
-            lines.append("- %s [%s] -- %s" % (name, serviceType, TODO_DESC))
-
-        # Document subscriptions
-        lines.extend([
-            "",
-            "## Subscribers:",
-        ])
-        sortedSubs = sorted(self.__subs.keys())
-        for name in sortedSubs:
-            subType = self.__subs[name]
-            name = self.__removeNamespace(name)
-            lines.append("- %s [%s] -- %s" % (name, subType, TODO_DESC))
-
-        # Document publications
-        lines.extend([
-            "",
-            "## Publishers:",
-        ])
-        sortedPubs = sorted(self.__pubs)
-        for name in sortedPubs:
-            pubType = self.__pubs[name]
-            name = self.__removeNamespace(name)
-            lines.append("- %s [%s] -- %s" % (name, pubType, TODO_DESC))
-
         cleanNodeName = self.getCleanName()
         extension = FileExtension.get(docFormat)
         filename = join(outputDir, "%s.%s" % (cleanNodeName, extension))
 
-        # Convert the markdown format
         if docFormat == HTML:
-            lines = MarkdownToHtml.convert(lines)
+            lines = self.__generateHtml()
+        else:
+            lines = self.__generateMarkdown()
+
+        # Stream the data to the file one line at a time
+        with open(filename, "w", WRITE_BUFFER_SIZE) as fd:
+            fd.writelines(line + "\n" for line in lines)
+
+    def __generateMarkdown(self):
+        """Generate the markdown documentation for this node one line
+        at a time.
+
+        """
+        yield "# The %s node" % self.__nodeName
+
+        for title, entries in self.__generateSections():
+            yield ""
+            yield "## %s" % title
+            for entry in entries:
+                yield "- %s" % entry
+
+    def __generateHtml(self):
+        """Generate the HTML documentation for this node one line
+        at a time.
+
+        """
+        yield HTML_PROLOGUE
+        yield "<h1>The %s node</h1>" % self.__nodeName
+
+        for title, entries in self.__generateSections():
+            yield ""
+            yield "<h2>%s</h2>" % title
+
+            writingList = False
+            for entry in entries:
+                if not writingList:
+                    yield "<ul>"
+                    writingList = True
+                yield "<li>%s</li>" % entry
+
+            if writingList:
+                yield "</ul>"
 
-        # Write the data to the file
-        fd = open(filename, "w")
-        fd.write("%s\n" % "\n".join(lines))
-        fd.close()
+        yield HTML_EPILOGUE
 
-    def __removeNamespace(self, namespace):
-        """Update the given namespace to remove the private namespace
-        for this node, if it exists.
+    def __generateSections(self):
+        """Generate the title and entries of each section of the
+        documentation for this node.
 
-        * namespace -- the namespace item (topic, parameter, etc)
+        """
+        yield "Parameters:", self.__generateEntries(
+            (name, "TODO: type") for name in sorted(self.__params))
+
+        yield "Services:", self.__generateEntries(
+            sorted(self.__services.items()))
+        yield "Subscribers:", self.__generateEntries(
+            sorted(self.__subs.items()))
+        yield "Publishers:", self.__generateEntries(
+            sorted(self.__pubs.items()))
+
+    def __generateEntries(self, items):
+        """Generate the documentation entry for each item of a section.
+
+        * items -- iterable of (name, type) pairs for the section
 
         """
-        if namespace.startswith(self.__nodeName):
-            namespace = namespace.replace(self.__nodeName, "~", 1)
-        return namespace
+        # Names within the private namespace of this node are documented
+        # relative to the node (e.g., /node/param becomes ~/param)
+        nodeName = self.__nodeName
+        nodeNameLen = len(nodeName)
+
+        for name, itemType in items:
+            if name.startswith(nodeName):
+                name = "~" + name[nodeNameLen:]
+            yield "%s [%s] -- %s" % (name, itemType, TODO_DESC)
 
 
 class RosDocWriter:
@@ -169,7 +202,11 @@ class RosDocWriter:
                        will be monitored if the list is empty)
 
         """
-        self.__nodeNames = nodeNames
+        # Node information is updated from multiple server threads
+        self.__lock = Lock()
+
+        # All nodes are monitored when no specific nodes are given
+        self.__monitorAll = (len(nodeNames) == 0)
 
         self.__nodes = {}
         for nodeName in nodeNames:
@@ -182,8 +219,9 @@ class RosDocWriter:
         * param -- the parameter
 
         """
-        if self.__hasNode(nodeName):
-            self.__getNode(nodeName).addParam(param)
+        with self.__lock:
+            if self.__hasNode(nodeName):
+                self.__getNode(nodeName).addParam(param)
 
     def addPub(self, nodeName, topic, pubType):
         """Add a published topic to a node.
@@ -193,8 +231,9 @@ class RosDocWriter:
         * pubType -- the type of data
 
         """
-        if self.__hasNode(nodeName):
-            self.__getNode(nodeName).addPub(topic, pubType)
+        with self.__lock:
+            if self.__hasNode(nodeName):
+                self.__getNode(nodeName).addPub(topic, pubType)
 
     def addSub(self, nodeName, topic, subType):
         """Add a subscribed topic to a node.
@@ -204,8 +243,9 @@ class RosDocWriter:
         * subType -- the type of data
 
         """
-        if self.__hasNode(nodeName):
-            self.__getNode(nodeName).addSub(topic, subType)
+        with self.__lock:
+            if self.__hasNode(nodeName):
+                self.__getNode(nodeName).addSub(topic, subType)
 
     def addService(self, nodeName, service, serviceType):
         """Add a service to a node.
@@ -215,8 +255,9 @@ class RosDocWriter:
         * serviceType -- the type of data
 
         """
-        if self.__hasNode(nodeName):
-            self.__getNode(nodeName).addService(service, serviceType)
+        with self.__lock:
+            if self.__hasNode(nodeName):
+                self.__getNode(nodeName).addService(service, serviceType)
 
     def document(self, outputDir, docFormat=MARKDOWN):
         """Document the information pertaining to the nodes.
@@ -225,15 +266,27 @@ class RosDocWriter:
         * docFormat -- the desired format of the documentation
 
         """
-        for nodeName, node in self.__nodes.iteritems():
-            print "    Documenting %s..." % nodeName
-            node.document(outputDir, docFormat)
-
-        # Write a manifest file to link to all other nodes, if there are
-        # multiple nodes being documented
-        if len(self.__nodes) > 0:
-            print "Creating documentation manifest..."
-            self.__writeManifest(outputDir, docFormat)
+        # Prevent node information from changing while it is documented
+        with self.__lock:
+            # Each node writes to its own file, so the nodes can be
+            # documented in parallel
+            numThreads = max(1, min(MAX_DOC_THREADS, len(self.__nodes)))
+            with ThreadPoolExecutor(max_workers=numThreads) as executor:
+                futures = []
+                for node in self.__nodes.values():
+                    print("    Documenting %s..." % node.getName())
+                    futures.append(
+                        executor.submit(node.document, outputDir, docFormat))
+
+                # Wait for all nodes to be documented (re-raising any errors)
+                for future in futures:
+                    future.result()
+
+            # Write a manifest file to link to all other nodes, if there are
+            # multiple nodes being documented
+            if len(self.__nodes) > 0:
+                print("Creating documentation manifest...")
+                self.__writeManifest(outputDir, docFormat)
 
     def __writeManifest(self, outputDir, docFormat=MARKDOWN):
         """Write the documentation manifest file which links to the
@@ -247,33 +300,53 @@ class RosDocWriter:
         filename = "index" if docFormat == HTML else "README"
         manifest = join(outputDir, "%s.%s" % (filename, extension))
 
-        lines = [
-            "# ROS system documentation"
-            "",
-            "## Nodes",
-            "",
-        ]
+        if docFormat == HTML:
+            lines = self.__generateManifestHtml()
+        else:
+            lines = self.__generateManifestMarkdown()
+
+        # Stream the data to the manifest file one line at a time
+        with open(manifest, "w", WRITE_BUFFER_SIZE) as fd:
+            fd.writelines(line + "\n" for line in lines)
+
+    def __generateManifestMarkdown(self):
+        """Generate the markdown content of the documentation manifest
+        one line at a time.
+
+        """
+        yield "# ROS system documentation"
+        yield ""
+        yield "## Nodes"
+        yield ""
 
         # Add links to all nodes in alphabetical order
         sortedNodes = sorted(self.__nodes.keys())
         for nodeName in sortedNodes:
-            node = self.__nodes[nodeName]
-            cleanNodeName = node.getCleanName()
+            cleanNodeName = self.__nodes[nodeName].getCleanName()
+            yield "- [%s](%s.md)" % (nodeName, cleanNodeName)
 
-            link = "- [%s](%s.md)" % (nodeName, cleanNodeName)
-            if docFormat == HTML:
-                link = '- <a href="%s.html">%s</a>' % (cleanNodeName, nodeName)
+    def __generateManifestHtml(self):
+        """Generate the HTML content of the documentation manifest
+        one line at a time.
 
-            lines.append(link)
+        """
+        yield HTML_PROLOGUE
+        yield "<h1>ROS system documentation</h1>"
+        yield ""
+        yield "<h2>Nodes</h2>"
+        yield ""
 
-        # Convert the markdown format
-        if docFormat == HTML:
-            lines = MarkdownToHtml.convert(lines)
+        # Add links to all nodes in alphabetical order
+        sortedNodes = sorted(self.__nodes.keys())
+        if len(sortedNodes) > 0:
+            yield "<ul>"
+            for nodeName in sortedNodes:
+                cleanNodeName = self.__nodes[nodeName].getCleanName()
+                yield '<li><a href="%s.html">%s</a></li>' % (
+                    cleanNodeName, nodeName)
+            yield "</ul>"
 
-        # Write the data to the manifest file
-        fd = open(manifest, "w")
-        fd.write("%s\n" % "\n".join(lines))
-        fd.close()
+        yield HTML_EPILOGUE
 
     def __hasNode(self, nodeName):
         """Determine if this node is being monitored.
@@ -281,7 +354,7 @@ class RosDocWriter:
         * nodeName -- the node
 
         """
-        return (len(self.__nodeNames) == 0 or nodeName in self.__nodes)
+        return (self.__monitorAll or nodeName in self.__nodes)
 
     def __getNode(self, nodeName):
         """Get the NodeInfo object.
@@ -1,3 +1,6 @@
+import re
+
+
 # Set of valid doc formats
 MARKDOWN = "markdown"
 HTML = "html"
@@ -8,12 +11,32 @@ SUPPORTED_DOC_FORMATS = [
     HTML,
 ]
 
+# Content which begins and ends every HTML document
+HTML_PROLOGUE = "<html>\n<head></head>\n<body>"
+HTML_EPILOGUE = "</body>\n</html>"
+
+# Map of markdown line prefixes to the HTML format for that line
+_HTML_LINE_FORMATS = {
+    "## ": "<h2>%s</h2>",  # Subsection
+    "# ": "<h1>%s</h1>",  # Section
+    "- ": "<li>%s</li>",  # List entry
+}
+
+# Regular expression which splits a markdown line into its prefix (if
+# any) and its content
+_MARKDOWN_LINE = re.compile(r"(## |# |- )?(.*)", re.DOTALL)
+
 
 class FileExtension:
     """The FileExtension class makes it possible to get the file extension
     based on the format of the file.
 
     """
+    # Map of documentation formats to their file extension
+    ExtensionMap = {
+        MARKDOWN: "md",
+        HTML: "html",
+    }
 
     @classmethod
     def get(cls, docFormat):
@@ -23,12 +46,7 @@ class FileExtension:
         * docFormat -- the documentation format identifier
 
         """
-        extensionMap = {
-            MARKDOWN: "md",
-            HTML: "html",
-        }
-
-        return extensionMap.get(docFormat)
+        return cls.ExtensionMap.get(docFormat)
 
 
 class MarkdownToHtml:
@@ -39,55 +57,41 @@ class MarkdownToHtml:
 
     @classmethod
     def convert(cls, lines):
-        """Conver the given markdown data (as a list of strings) into HTML
-        content (also as a list of strings).
+        """Convert the given markdown data (as an iterable of strings) into
+        HTML content, which is generated one line at a time.
 
-        * lines -- the input list of markdown lines
+        * lines -- the input iterable of markdown lines
 
         """
-        htmlLines = [
-            "<html>",
-            "<head>"
-            "</head>",
-        ]
+        yield HTML_PROLOGUE
 
+        lineFormats = _HTML_LINE_FORMATS
+        matchLine = _MARKDOWN_LINE.match
         writingList = False
         for line in lines:
-            isList = False
-            if line.startswith("## "):
-                # Subsection
-                data = line[3:]
-                line = "<h2>%s</h2>" % data
-            elif line.startswith("# "):
-                # Section
-                data = line[2:]
-                line = "<h1>%s</h1>" % data
-            elif line.startswith("- "):
-                # List entry
-                isList = True
-                if not writingList:
-                    htmlLines.append("<ul>")
-                    writingList = True
-
-                data = line[2:]
-                line = "<li>%s</li>" % data
+            prefix, data = matchLine(line).groups()
+            lineFormat = lineFormats.get(prefix)
+
+            # Open a list that is starting, or close a list that has ended
+            isList = (prefix == "- ")
+            if isList and not writingList:
+                yield "<ul>"
+                writingList = True
+            elif not isList and writingList:
+                yield "</ul>"
+                writingList = False
+
+            if lineFormat is not None:
+                # Section, subsection, or list entry
+                line = lineFormat % data
             elif len(line.strip()) > 0:
                 # Normal text content
                 line = "<p>%s</p>" % line
 
-            # Close a list that has ended
-            if not isList and writingList:
-                htmlLines.append("</ul>")
-                writingList = False
-
-            htmlLines.append(line)
+            yield line
 
         # Close the list if one was being created
         if writingList:
-            htmlLines.append("</ul>")
-
-        htmlLines.extend([
-            "</html>",
-        ])
+            yield "</ul>"
 
-        return htmlLines
+        yield HTML_EPILOGUE
@@ -1,12 +1,15 @@
+import queue
 import socket
 import argparse
+import traceback
 from os.path import exists, abspath, curdir
 
-import xmlrpclib
-from SimpleXMLRPCServer import SimpleXMLRPCServer
+import xmlrpc.client
+from socketserver import ThreadingMixIn
+from xmlrpc.server import SimpleXMLRPCServer
 
-from docWriter import RosDocWriter
-from formatConverters import MARKDOWN, SUPPORTED_DOC_FORMATS
+from .docWriter import RosDocWriter
+from .formatConverters import MARKDOWN, SUPPORTED_DOC_FORMATS
 
 import rosgraph
 
@@ -48,40 +51,51 @@ class RosMasterFunctions:
         "getParamNames",
     ]
 
-    # List of ROS parameters to ignore
-    FilterParameters = [
+    # Set of ROS parameters to ignore
+    FilterParameters = frozenset([
         "/tcp_keepalive",
         "/use_sim_time",
-    ]
+    ])
 
-    # List of published ROS topics to ignore
-    FilterPublishedTopic = [
+    # Set of published ROS topics to ignore
+    FilterPublishedTopic = frozenset([
         "/rosout",
-    ]
+    ])
 
-    # List of subscribed ROS topics to ignore
-    FilterSubscribedTopics = [
-    ]
+    # Set of subscribed ROS topics to ignore
+    FilterSubscribedTopics = frozenset([
+    ])
 
-    # List of ROS services to ignore
-    FilterServices = [
-    ]
+    # Set of ROS services to ignore
+    FilterServices = frozenset([
+    ])
 
-    def __init__(self, nodeNames):
+    def __init__(self, nodeNames, verbose=False):
         """Create a RosMasterFunctions object.
 
         * nodeNames -- the list of node names to document
+        * verbose -- true for verbose mode
 
         """
-        masterUri = 'http://%s:%s' % (self.RosMasterHost, self.RosMasterPort)
+        self.__verbose = verbose
+        self.__masterUri = 'http://%s:%s' % (
+            self.RosMasterHost, self.RosMasterPort)
 
-        # Create an XMLRPC client to connect to the ROS master
-        self.__client = xmlrpclib.ServerProxy(masterUri)
+        # XMLRPC clients (connected to the ROS master) which are not
+        # currently being used by any thread
+        self.__idleClients = queue.Queue()
 
         # Register all ROS master methods with this class to allow custom
         # functionality to be executed prior to sending the data to the
         # ROS master
+        self.__callbacks = {}
         for method in self.RosMasterMethods:
+            # Look up the intercept callback for the method once, if
+            # this class has one
+            callbackFn = getattr(self, "_%s" % method, None)
+            if callbackFn is not None:
+                self.__callbacks[method] = callbackFn
+
             wrapper = self.__getWrapper(method)
             setattr(self, method, wrapper)
 
@@ -110,6 +124,12 @@ class RosMasterFunctions:
         * method -- is the desired ROS master XMLRPC function to call
 
         """
+        # Resolve everything needed by the wrapper up front, since it is
+        # called for every request made to the ROS master
+        callbackFn = self.__callbacks.get(method)
+        intercept = self.__intercept
+        callMaster = self.__callMaster
+
         def wrap(*args):
             """Callback function for an XMLRPC function.
 
@@ -119,21 +139,73 @@ class RosMasterFunctions:
             # If this class has a method callback registered, then
             # make sure we call the callback. Otherwise, just pass
             # the call through to the true ROS master server
-            try:
-                callback = "_%s" % method
-                if hasattr(self, callback):
-                    callbackFn = getattr(self, callback)
-                    callbackFn(*args)
-            except Exception, e:
-                import traceback
-                traceback.print_exc()
+            if callbackFn is not None:
+                intercept(method, callbackFn, args)
 
             # Pass the call through to the ROS master
-            masterFn = getattr(self.__client, method)
-            return masterFn(*args)
+            return callMaster(method, args)
 
         return wrap
 
+    def _forwardMulticall(self, callList):
+        """Intercept each call in a system.multicall request and then
+        forward the entire batch to the ROS master as a single
+        system.multicall, rather than making one request per call.
+
+        NOTE: the leading underscore prevents this method from being
+              served over XMLRPC, the batch must be validated by the
+              caller to only contain ROS master methods
+
+        * callList -- the list of calls, each a dictionary containing the
+                      methodName and params for the call
+
+        """
+        for call in callList:
+            method = call["methodName"]
+            callbackFn = self.__callbacks.get(method)
+            if callbackFn is not None:
+                self.__intercept(method, callbackFn, call["params"])
+
+        # Pass the batch of calls through to the ROS master
+        return self.__callMaster("system.multicall", (callList,))
+
+    def __callMaster(self, method, args):
+        """Call the given XMLRPC method on the ROS master.
+
+        * method -- the ROS master XMLRPC function to call
+        * args -- the method input arguments
+
+        """
+        # XMLRPC clients cannot be shared between threads, so borrow an
+        # idle client for the duration of the call (or create a new one
+        # if all clients are in use)
+        try:
+            client = self.__idleClients.get_nowait()
+        except queue.Empty:
+            client = xmlrpc.client.ServerProxy(self.__masterUri)
+
+        try:
+            masterFn = getattr(client, method)
+            return masterFn(*args)
+        finally:
+            self.__idleClients.put(client)
+
+    def __intercept(self, method, callbackFn, args):
+        """Call the intercept callback for a ROS master XMLRPC method.
+
+        * method -- the ROS master XMLRPC function being called
+        * callbackFn -- the intercept callback for the method
+        * args -- the method input arguments
+
+        """
+        try:
+            callbackFn(*args)
+        except Exception as e:
+            if self.__verbose:
+                traceback.print_exc()
+            else:
+                print("ERROR: failed to intercept %s: %s" % (method, e))
+
     def _registerPublisher(self, callerId, topic, topicType, callerApi):
         """Intercept callback for the registerPublisher function.
 
@@ -203,6 +275,15 @@ class RosMasterFunctions:
             self.__docWriter.addParam(callerId, key)
 
 
+class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """The ThreadingXMLRPCServer class is an XMLRPC server which handles
+    each request in a separate thread.
+
+    """
+    # Do not wait for requests that are still being handled on exit
+    daemon_threads = True
+
+
 class RosMasterProxy:
     """The RosMasterProxy class implements an XMLRPC proxy server to
     intercept calls to the ROS master. These calls are monitored and
@@ -223,8 +304,9 @@ class RosMasterProxy:
         * verbose -- true for verbose mode
 
         """
-        # Create the XMLRPC server
-        self.__server = SimpleXMLRPCServer(
+        # Create the XMLRPC server, handling requests in parallel so that
+        # one slow call (e.g., during roslaunch) does not block others
+        self.__server = ThreadingXMLRPCServer(
             (hostname, port),
             logRequests=verbose)
 
@@ -233,13 +315,31 @@ class RosMasterProxy:
         # NOTE: These are not supported by the proper ROS master
         self.__server.register_introspection_functions()
 
-        # Support multi-call methods which are used by roslaunch
-        self.__server.register_multicall_functions()
-
         # Register the XMLRPC functions to support the ROS master API
-        self.__masterFunctions = RosMasterFunctions(nodeName)
+        self.__masterFunctions = RosMasterFunctions(nodeName, verbose)
         self.__server.register_instance(self.__masterFunctions)
 
+        # Support multi-call methods which are used by roslaunch
+        self.__server.register_function(self.__multicall, "system.multicall")
+
+    def __multicall(self, callList):
+        """Handle a system.multicall request.
+
+        * callList -- the list of calls, each a dictionary containing the
+                      methodName and params for the call
+
+        """
+        # Batches made up entirely of ROS master calls are forwarded to
+        # the ROS master in a single request, anything else (e.g.,
+        # introspection methods) must be handled by this server
+        masterMethods = RosMasterFunctions.RosMasterMethods
+        for call in callList:
+            if not isinstance(call, dict) or "params" not in call or \
+               call.get("methodName") not in masterMethods:
+                return self.__server.system_multicall(callList)
+
+        return self.__masterFunctions._forwardMulticall(callList)
+
     def start(self):
         """Start the RosMasterProxy"""
         # Run the server's main loop
@@ -292,30 +392,30 @@ def main():
 
     # Make sure the format is valid
     if docFormat not in SUPPORTED_DOC_FORMATS:
-        print "ERROR: unknown doc-format argument: %s" % docFormat
+        print("ERROR: unknown doc-format argument: %s" % docFormat)
         exit(2)
 
     # Ensure that the output directory exists
     if not exists(outputDir):
-        print "ERROR: the output directory does not exist: %s" % outputDir
+        print("ERROR: the output directory does not exist: %s" % outputDir)
         exit(3)
 
     # Make sure the ROS master is running
     try:
         rosgraph.Master('/rostopic').getPid()
     except socket.error:
-        print "ERROR: failed to communicate with the ROS master!"
+        print("ERROR: failed to communicate with the ROS master!")
         exit(4)
 
     # Create the ROS master proxy node
     masterProxy = RosMasterProxy(nodeNames, port=proxyPort)
 
     try:
-        print "Starting server..."
+        print("Starting server...")
         masterProxy.start()
     except (KeyboardInterrupt, SystemExit):
         pass
 
     # Document the information about the node
-    print "Documenting..."
+    print("Documenting...")
     masterProxy.document(outputDir, docFormat=docFormat)
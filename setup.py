@@ -1,5 +1,5 @@
-#!/usr/bin/env python
-from distutils.core import setup
+#!/usr/bin/env python3
+from setuptools import setup
 
 
 setup(
@@ -10,5 +10,6 @@ setup(
     author_email='ponsler@gmail.com',
     url='https://github.com/bponsler/rosautodoc',
     packages=['rosautodoc'],
+    python_requires='>=3',
     scripts=['scripts/rosautodoc']
 )